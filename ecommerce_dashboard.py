@@ -1,17 +1,22 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import polars as pl
+from charset_normalizer import from_bytes
 import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.figure_factory as ff
-import seaborn as sns
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
+import codecs
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+import threading
 import warnings
 
 warnings.filterwarnings("ignore")
 
+logger = logging.getLogger(__name__)
+
 # Configure Streamlit page
 st.set_page_config(
     page_title="E-Commerce Analytics Dashboard",
@@ -58,111 +63,308 @@ st.markdown(
 )
 
 
-@st.cache_data
-def load_data():
-    """Load and cache the e-commerce data with proper encoding handling"""
+DATA_FILES = [
+    "customer_dim.csv",
+    "item_dim.csv",
+    "store_dim.csv",
+    "time_dim.csv",
+    "Trans_dim.csv",
+    "fact_table.csv",
+]
+# Tried in order when a file is not UTF-8 or its detected encoding fails;
+# latin-1 maps every byte, so it always succeeds
+FALLBACK_ENCODINGS = ["cp1252", "latin-1"]
+CACHE_DIR = "_cache"
+# Bump whenever build_comprehensive_data changes the columns or dtypes it returns
+CACHE_VERSION = 6
+
+
+def detect_encoding(filename):
+    """Detect a CSV's text encoding from its first 64 KB"""
+    with open(filename, "rb") as csv_file:
+        sample = csv_file.read(65536)
+    # Cut back to the last full line so a multi-byte character split at the
+    # sample boundary cannot skew detection
+    if b"\n" in sample:
+        sample = sample[: sample.rindex(b"\n") + 1]
+    match = from_bytes(sample).best()
+    return match.encoding if match is not None else None
+
+
+def is_utf8(filename):
+    """Check that a whole file decodes as strict UTF-8, reading it in 1 MB chunks"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(filename, "rb") as csv_file:
+        try:
+            for chunk in iter(lambda: csv_file.read(1 << 20), b""):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return False
+    return True
+
+
+def build_comprehensive_data():
+    """Join the CSVs into the comprehensive dataset with a lazy Polars pipeline"""
+
+    def scan_csv(filename, schema_overrides=None):
+        encoding = detect_encoding(filename)
+        if encoding is None:
+            # Last resort: read as UTF-8 with invalid bytes replaced
+            return pl.scan_csv(
+                filename, encoding="utf8-lossy", schema_overrides=schema_overrides
+            )
 
-    def load_csv_with_encoding(filename):
-        encodings = ["utf-8", "latin-1", "iso-8859-1", "cp1252", "utf-8-sig"]
-        for encoding in encodings:
+        if encoding in ("ascii", "utf_8"):
+            # The sample only covers 64 KB, so confirm the rest before trusting it
+            if is_utf8(filename):
+                return pl.scan_csv(
+                    filename, encoding="utf8", schema_overrides=schema_overrides
+                )
+            encodings = FALLBACK_ENCODINGS
+        else:
+            encodings = [encoding] + FALLBACK_ENCODINGS
+
+        # Polars only scans UTF-8, so other encodings are decoded up front
+        for candidate in encodings:
             try:
-                return pd.read_csv(filename, encoding=encoding)
+                return pl.read_csv(
+                    filename, encoding=candidate, schema_overrides=schema_overrides
+                ).lazy()
             except UnicodeDecodeError:
                 continue
         raise Exception(f"Could not load {filename} with any encoding")
 
-    try:
-        # Load all datasets
-        customer_dim = load_csv_with_encoding("customer_dim.csv")
-        item_dim = load_csv_with_encoding("item_dim.csv")
-        store_dim = load_csv_with_encoding("store_dim.csv")
-        time_dim = load_csv_with_encoding("time_dim.csv")
-        trans_dim = load_csv_with_encoding("Trans_dim.csv")
-        fact_table = load_csv_with_encoding("fact_table.csv")
-
-        # Data cleaning and preprocessing
-        # Convert date column
-        time_dim["date"] = pd.to_datetime(
-            time_dim["date"], format="%d-%m-%Y %H:%M", errors="coerce"
-        )
-
-        # Clean item data
-        item_dim["main_category"] = item_dim["desc"].apply(
-            lambda x: (
-                x.split(" - ")[0].strip()
-                if pd.notna(x) and " - " in x
-                else str(x).strip()
-            )
-        )
+    # Scan all datasets lazily; nothing is read until the pipeline is collected
+    customer_dim = scan_csv("customer_dim.csv")
+    item_dim = scan_csv("item_dim.csv")
+    store_dim = scan_csv("store_dim.csv")
+    time_dim = scan_csv("time_dim.csv")
+    trans_dim = scan_csv("Trans_dim.csv")
+    # Narrow numeric types halve the bytes moved by every filter and groupby;
+    # total_price stays float64 so revenue totals keep full precision
+    fact_table = scan_csv(
+        "fact_table.csv",
+        schema_overrides={
+            "quantity": pl.Int32,
+            "unit_price": pl.Float32,
+            "total_price": pl.Float64,
+        },
+    )
 
-        # Handle missing values
-        trans_dim["bank_name"] = trans_dim["bank_name"].replace("None", np.nan)
+    # Data cleaning and preprocessing
+    # Convert date column
+    time_dim = time_dim.with_columns(
+        pl.col("date").str.strptime(pl.Datetime, "%d-%m-%Y %H:%M", strict=False)
+    )
 
-        # Create comprehensive dataset
-        comprehensive_data = (
-            fact_table.merge(
-                customer_dim[["coustomer_key", "name"]], on="coustomer_key", how="left"
-            )
-            .merge(
-                item_dim[
-                    [
-                        "item_key",
-                        "item_name",
-                        "main_category",
-                        "man_country",
-                        "supplier",
-                    ]
-                ],
-                on="item_key",
-                how="left",
-            )
-            .merge(store_dim, on="store_key", how="left")
-            .merge(
-                time_dim[["time_key", "date", "year", "month", "quarter"]],
-                on="time_key",
-                how="left",
-            )
-            .merge(trans_dim, on="payment_key", how="left")
+    # Clean item data
+    item_dim = item_dim.with_columns(
+        pl.col("desc")
+        .str.split(" - ")
+        .list.first()
+        .str.strip_chars()
+        .alias("main_category")
+    )
+
+    # Handle missing values
+    trans_dim = trans_dim.with_columns(pl.col("bank_name").replace("None", None))
+
+    # Create comprehensive dataset, projecting each dimension down to the
+    # columns used by the dashboard before joining
+    comprehensive_data = (
+        fact_table.join(
+            customer_dim.select(["coustomer_key", "name"]),
+            on="coustomer_key",
+            how="left",
+            validate="m:1",
         )
+        .join(
+            item_dim.select(
+                [
+                    "item_key",
+                    "item_name",
+                    "main_category",
+                    "man_country",
+                    "supplier",
+                ]
+            ),
+            on="item_key",
+            how="left",
+            validate="m:1",
+        )
+        .join(
+            store_dim.select(["store_key", "division", "district"]),
+            on="store_key",
+            how="left",
+            validate="m:1",
+        )
+        .join(
+            time_dim.select(
+                [
+                    "time_key",
+                    "date",
+                    pl.col("year").cast(pl.Int16),
+                    pl.col("month").cast(pl.Int8),
+                    "quarter",
+                ]
+            ),
+            on="time_key",
+            how="left",
+            validate="m:1",
+        )
+        .join(
+            trans_dim.select(["payment_key", "trans_type", "bank_name"]),
+            on="payment_key",
+            how="left",
+            validate="m:1",
+        )
+        # Sorted by date so the date filter can binary-search the range
+        .sort("date")
+        .collect(engine="streaming")
+        .to_pandas()
+    )
 
-        # Add derived metrics
-        comprehensive_data["profit_margin"] = (
-            (
-                comprehensive_data["total_price"]
-                - (comprehensive_data["unit_price"] * 0.7)
-            )
-            / comprehensive_data["total_price"]
-            * 100
-        )
-        comprehensive_data["month_name"] = pd.to_datetime(
-            comprehensive_data["date"]
-        ).dt.strftime("%B")
-        comprehensive_data["weekday"] = pd.to_datetime(
-            comprehensive_data["date"]
-        ).dt.day_name()
-
-        return {
-            "comprehensive": comprehensive_data,
-            "customer_dim": customer_dim,
-            "item_dim": item_dim,
-            "store_dim": store_dim,
-            "time_dim": time_dim,
-            "trans_dim": trans_dim,
-            "fact_table": fact_table,
-        }
+    # Add derived metrics once here so the charts never re-derive them per render
+    total_price = comprehensive_data["total_price"].to_numpy()
+    unit_price = comprehensive_data["unit_price"].to_numpy()
+    comprehensive_data["profit_margin"] = (
+        (total_price - unit_price * 0.7) / total_price * 100
+    ).astype(np.float32)
+    dates = comprehensive_data["date"].dt
+    comprehensive_data["hour"] = dates.hour
+    comprehensive_data["weekday"] = dates.day_name().astype("category")
+    comprehensive_data["month_name"] = dates.month_name().astype("category")
+
+    # Low-cardinality keys become categoricals so groupbys hash integer codes
+    for column in [
+        "division",
+        "district",
+        "trans_type",
+        "main_category",
+        "man_country",
+        "bank_name",
+        "supplier",
+    ]:
+        comprehensive_data[column] = comprehensive_data[column].astype("category")
+
+    return comprehensive_data
+
+
+def write_cache(comprehensive_data, cache_path):
+    """Persist the comprehensive dataset as the current Parquet cache"""
+    temp_path = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Drop caches built from older versions of the CSVs
+        for stale_path in glob.glob(os.path.join(CACHE_DIR, "comprehensive_*.parquet")):
+            os.remove(stale_path)
+        # Write to a uniquely named temporary file first so concurrent builds
+        # never share it and a half-written cache is never read
+        fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+        comprehensive_data.to_parquet(
+            temp_path, engine="pyarrow", compression="zstd", index=False
+        )
+        # mkstemp creates the file owner-only; keep the cache readable by other
+        # accounts that share the directory
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        # The disk cache is only an optimisation; the next cold start rebuilds it
+        logger.warning(f"Could not write data cache {cache_path}: {str(e)}")
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_or_build():
+    """Read the comprehensive dataset from the Parquet cache or rebuild it"""
+    # The cache key changes whenever any source CSV is modified or replaced
+    fingerprint = hashlib.sha1(f"v{CACHE_VERSION}".encode())
+    for filename in DATA_FILES:
+        stat = os.stat(filename)
+        fingerprint.update(f"{filename}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    cache_path = os.path.join(
+        CACHE_DIR, f"comprehensive_{fingerprint.hexdigest()[:16]}.parquet"
+    )
+
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path, engine="pyarrow")
+        except Exception:
+            # A truncated or unreadable cache is discarded and rebuilt below
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
+    comprehensive_data = build_comprehensive_data()
+
+    # Compressing and writing the cache overlaps with the first render instead
+    # of delaying it
+    threading.Thread(target=write_cache, args=(comprehensive_data, cache_path)).start()
+
+    return comprehensive_data
+
+
+@st.cache_data
+def load_data():
+    """Load and cache the e-commerce data, backed by an on-disk Parquet cache"""
+    try:
+        return {"comprehensive": load_or_build()}
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         return None
 
 
-def create_kpi_metrics(data):
-    """Create KPI metrics cards"""
+def apply_filters(data, date_range, divisions, payment_methods):
+    """Apply sidebar filters to the comprehensive data"""
+    if len(date_range) == 2:
+        start, end = data["date"].searchsorted(
+            [
+                pd.Timestamp(date_range[0]),
+                pd.Timestamp(date_range[1]) + pd.Timedelta(days=1),
+            ]
+        )
+        data = data.iloc[start:end]
+
+    # Division and payment filters share a single boolean mask
+    mask = np.ones(len(data), dtype=bool)
+    if divisions:
+        mask &= data["division"].isin(divisions).to_numpy()
+    if payment_methods:
+        mask &= data["trans_type"].isin(payment_methods).to_numpy()
+
+    return data[mask]
+
+
+def compute_customer_metrics(data):
+    """Aggregate spend, order value, order count and quantity per customer"""
+    customer_metrics = (
+        data.groupby("coustomer_key", sort=False, observed=True)
+        .agg({"total_price": ["sum", "mean", "count"], "quantity": "sum"})
+        .round(2)
+    )
+    customer_metrics.columns = [
+        "Total Spent",
+        "Avg Order Value",
+        "Order Count",
+        "Total Quantity",
+    ]
+
+    return customer_metrics
+
+
+def create_kpi_metrics(data, customer_metrics):
+    """Create KPI metrics cards and return the total revenue they show"""
     col1, col2, col3, col4, col5 = st.columns(5)
 
-    total_revenue = data["total_price"].sum()
+    # A single reduction over total_price; the average follows from the sum
+    total_revenue = np.add.reduce(data["total_price"].to_numpy())
     total_orders = len(data)
-    avg_order_value = data["total_price"].mean()
-    total_customers = data["coustomer_key"].nunique()
+    avg_order_value = total_revenue / total_orders
+    total_customers = len(customer_metrics)
     total_products = data["item_key"].nunique()
 
     with col1:
@@ -220,6 +422,8 @@ def create_kpi_metrics(data):
             unsafe_allow_html=True,
         )
 
+    return total_revenue
+
 
 def create_revenue_trends(data):
     """Create animated revenue trend charts"""
@@ -229,13 +433,17 @@ def create_revenue_trends(data):
     )
 
     # Monthly revenue trend with animation
+    # Truncating to datetime64[M] keeps the month key in int64 rather than
+    # building a Period object per row; only the grouped result is formatted
+    month_key = data["date"].to_numpy().astype("datetime64[M]")
     monthly_data = (
-        data.groupby([data["date"].dt.to_period("M"), "division"])["total_price"]
+        data.groupby([month_key, "division"], sort=False, observed=True)["total_price"]
         .sum()
+        .rename_axis(["date", "division"])
         .reset_index()
     )
-    monthly_data["date"] = monthly_data["date"].astype(str)
-    monthly_data = monthly_data.sort_values("date")
+    monthly_data["date"] = monthly_data["date"].dt.strftime("%Y-%m")
+    monthly_data = monthly_data.sort_values(["date", "division"])
 
     col1, col2 = st.columns([2, 1])
 
@@ -261,7 +469,11 @@ def create_revenue_trends(data):
 
     with col2:
         # Revenue by quarter pie chart
-        quarterly_revenue = data.groupby("quarter")["total_price"].sum().reset_index()
+        quarterly_revenue = (
+            data.groupby("quarter", sort=False, observed=True)["total_price"]
+            .sum()
+            .reset_index()
+        )
         fig_pie = px.pie(
             quarterly_revenue,
             values="total_price",
@@ -279,7 +491,7 @@ def create_revenue_trends(data):
         st.plotly_chart(fig_pie, use_container_width=True)
 
 
-def create_geographic_analysis(data):
+def create_geographic_analysis(data, division_revenue):
     """Create geographic performance dashboard"""
     st.markdown(
         '<p class="section-header">🗺️ Geographic Performance Analysis</p>',
@@ -288,23 +500,11 @@ def create_geographic_analysis(data):
 
     # Division performance
     division_stats = (
-        data.groupby("division")
-        .agg(
-            {
-                "total_price": ["sum", "mean"],
-                "quantity": "sum",
-                "coustomer_key": "nunique",
-            }
-        )
+        division_revenue.sort_values(ascending=False)
         .round(2)
+        .rename("Total Revenue")
+        .reset_index()
     )
-    division_stats.columns = [
-        "Total Revenue",
-        "Avg Order Value",
-        "Total Quantity",
-        "Unique Customers",
-    ]
-    division_stats = division_stats.reset_index()
 
     col1, col2 = st.columns(2)
 
@@ -327,7 +527,12 @@ def create_geographic_analysis(data):
     with col2:
         # Treemap for districts
         district_data = (
-            data.groupby(["division", "district"])["total_price"].sum().reset_index()
+            data.groupby(["division", "district"], sort=False, observed=True)[
+                "total_price"
+            ]
+            .sum()
+            .reset_index()
+            .query("total_price > 0")
         )
         fig_treemap = px.treemap(
             district_data,
@@ -342,48 +547,80 @@ def create_geographic_analysis(data):
         st.plotly_chart(fig_treemap, use_container_width=True)
 
 
-def create_customer_analysis(data):
+SEGMENT_NAMES = [
+    "One-time Buyers",
+    "Regular Customers",
+    "Loyal Customers",
+    "VIP Customers",
+]
+# Segment code per (order count bin, spend bin). Order count bins are 1, 2,
+# 3-4 and 5+ orders; spend bins split at the 50th and 75th percentiles.
+SEGMENT_CODES = np.array(
+    [
+        [0, 0, 0],
+        [1, 1, 1],
+        [1, 2, 2],
+        [1, 2, 3],
+    ],
+    dtype=np.int8,
+)
+# Above this many customers a fused parallel kernel beats the NumPy lookups
+NUMBA_SEGMENT_THRESHOLD = 100_000
+
+
+@st.cache_resource
+def segment_kernel():
+    """Compile the parallel Numba segmentation kernel, once per process"""
+    # Imported here so small datasets never pay Numba's import and JIT cost
+    from numba import njit, prange
+
+    @njit(parallel=True)
+    def kernel(order_count, total_spent, spend_q50, spend_q75, out):
+        for i in prange(len(order_count)):
+            if order_count[i] >= 5 and total_spent[i] >= spend_q75:
+                out[i] = 3
+            elif order_count[i] >= 3 and total_spent[i] >= spend_q50:
+                out[i] = 2
+            elif order_count[i] >= 2:
+                out[i] = 1
+            else:
+                out[i] = 0
+
+    return kernel
+
+
+def create_customer_analysis(customer_metrics):
     """Create customer behavior analysis"""
     st.markdown(
         '<p class="section-header">👥 Customer Behavior Analytics</p>',
         unsafe_allow_html=True,
     )
 
-    # Customer segmentation
-    customer_metrics = (
-        data.groupby("coustomer_key")
-        .agg({"total_price": ["sum", "mean", "count"], "quantity": "sum"})
-        .round(2)
-    )
-    customer_metrics.columns = [
-        "Total Spent",
-        "Avg Order Value",
-        "Order Count",
-        "Total Quantity",
-    ]
+    # Customer segmentation logic: bin order count and spend, then look each
+    # customer's segment up in the code table
+    order_count = customer_metrics["Order Count"].to_numpy()
+    total_spent = customer_metrics["Total Spent"].to_numpy()
+    spend_q50, spend_q75 = customer_metrics["Total Spent"].quantile([0.50, 0.75])
 
-    # Customer segmentation logic
-    def segment_customers(row):
-        if row["Order Count"] >= 5 and row["Total Spent"] >= customer_metrics[
-            "Total Spent"
-        ].quantile(0.75):
-            return "VIP Customers"
-        elif row["Order Count"] >= 3 and row["Total Spent"] >= customer_metrics[
-            "Total Spent"
-        ].quantile(0.50):
-            return "Loyal Customers"
-        elif row["Order Count"] >= 2:
-            return "Regular Customers"
-        else:
-            return "One-time Buyers"
+    if len(customer_metrics) > NUMBA_SEGMENT_THRESHOLD:
+        segment_codes = np.empty(len(customer_metrics), dtype=np.int8)
+        segment_kernel()(order_count, total_spent, spend_q50, spend_q75, segment_codes)
+    else:
+        spend_bin = np.digitize(total_spent, [spend_q50, spend_q75])
+        count_bin = np.digitize(order_count, [2, 3, 5])
+        segment_codes = SEGMENT_CODES[count_bin, spend_bin]
 
-    customer_metrics["Segment"] = customer_metrics.apply(segment_customers, axis=1)
+    customer_metrics["Segment"] = pd.Categorical.from_codes(
+        segment_codes, categories=SEGMENT_NAMES
+    )
 
     col1, col2, col3 = st.columns(3)
 
     with col1:
         # Customer segments
         segment_counts = customer_metrics["Segment"].value_counts()
+        # Categorical counts include empty segments; keep them off the pie
+        segment_counts = segment_counts[segment_counts > 0]
         fig_segments = px.pie(
             values=segment_counts.values,
             names=segment_counts.index,
@@ -424,7 +661,7 @@ def create_customer_analysis(data):
         st.plotly_chart(fig_scatter, use_container_width=True)
 
 
-def create_product_analysis(data):
+def create_product_analysis(data, category_revenue):
     """Create product performance analysis"""
     st.markdown(
         '<p class="section-header">🛍️ Product Performance Analytics</p>',
@@ -435,12 +672,7 @@ def create_product_analysis(data):
 
     with col1:
         # Top categories by revenue
-        category_revenue = (
-            data.groupby("main_category")["total_price"]
-            .sum()
-            .sort_values(ascending=False)
-            .head(10)
-        )
+        category_revenue = category_revenue.sort_values(ascending=False).head(10)
 
         fig_cat = px.bar(
             x=category_revenue.values,
@@ -459,7 +691,7 @@ def create_product_analysis(data):
     with col2:
         # Country performance
         country_data = (
-            data.groupby("man_country")
+            data.groupby("man_country", sort=False, observed=True)
             .agg({"total_price": "sum", "quantity": "sum"})
             .sort_values("total_price", ascending=False)
             .head(10)
@@ -481,7 +713,7 @@ def create_product_analysis(data):
         st.plotly_chart(fig_country, use_container_width=True)
 
 
-def create_time_analysis(data):
+def create_time_analysis(data, weekday_revenue):
     """Create time-based analysis"""
     st.markdown(
         '<p class="section-header">⏰ Temporal Analytics</p>', unsafe_allow_html=True
@@ -491,20 +723,16 @@ def create_time_analysis(data):
 
     with col1:
         # Weekday performance
-        weekday_revenue = (
-            data.groupby("weekday")["total_price"]
-            .sum()
-            .reindex(
-                [
-                    "Monday",
-                    "Tuesday",
-                    "Wednesday",
-                    "Thursday",
-                    "Friday",
-                    "Saturday",
-                    "Sunday",
-                ]
-            )
+        weekday_revenue = weekday_revenue.reindex(
+            [
+                "Monday",
+                "Tuesday",
+                "Wednesday",
+                "Thursday",
+                "Friday",
+                "Saturday",
+                "Sunday",
+            ]
         )
 
         fig_weekday = px.bar(
@@ -523,14 +751,12 @@ def create_time_analysis(data):
 
     with col2:
         # Hourly heatmap
-        data["hour"] = pd.to_datetime(data["date"]).dt.hour
-        hourly_data = (
-            data.groupby(["weekday", "hour"])["total_price"].sum().reset_index()
-        )
-
-        # Pivot for heatmap
-        heatmap_data = hourly_data.pivot(
-            index="weekday", columns="hour", values="total_price"
+        # Unstack the grouped result straight into the weekday x hour grid
+        heatmap_data = (
+            data.groupby(["weekday", "hour"], sort=False, observed=True)["total_price"]
+            .sum()
+            .unstack("hour")
+            .sort_index(axis=1)
         )
         heatmap_data = heatmap_data.reindex(
             [
@@ -570,16 +796,12 @@ def create_payment_analysis(data):
     with col1:
         # Payment method distribution
         payment_stats = (
-            data.groupby("trans_type")
-            .agg({"total_price": ["sum", "count", "mean"]})
+            data.groupby("trans_type", sort=False, observed=True)["total_price"]
+            .sum()
             .round(2)
+            .rename("Total Revenue")
+            .reset_index()
         )
-        payment_stats.columns = [
-            "Total Revenue",
-            "Transaction Count",
-            "Avg Transaction",
-        ]
-        payment_stats = payment_stats.reset_index()
 
         fig_payment = px.sunburst(
             payment_stats,
@@ -598,7 +820,7 @@ def create_payment_analysis(data):
         bank_data = data[data["trans_type"] == "card"].dropna(subset=["bank_name"])
         if not bank_data.empty:
             bank_revenue = (
-                bank_data.groupby("bank_name")["total_price"]
+                bank_data.groupby("bank_name", sort=False, observed=True)["total_price"]
                 .sum()
                 .sort_values(ascending=False)
                 .head(8)
@@ -657,29 +879,19 @@ def main():
     # Division filter
     divisions = st.sidebar.multiselect(
         "Select Divisions",
-        options=data["division"].unique(),
-        default=data["division"].unique(),
+        options=data["division"].cat.categories.tolist(),
+        default=data["division"].cat.categories.tolist(),
     )
 
     # Payment method filter
     payment_methods = st.sidebar.multiselect(
         "Select Payment Methods",
-        options=data["trans_type"].unique(),
-        default=data["trans_type"].unique(),
+        options=data["trans_type"].cat.categories.tolist(),
+        default=data["trans_type"].cat.categories.tolist(),
     )
 
     # Apply filters
-    if len(date_range) == 2:
-        data = data[
-            (data["date"].dt.date >= date_range[0])
-            & (data["date"].dt.date <= date_range[1])
-        ]
-
-    if divisions:
-        data = data[data["division"].isin(divisions)]
-
-    if payment_methods:
-        data = data[data["trans_type"].isin(payment_methods)]
+    data = apply_filters(data, date_range, divisions, payment_methods)
 
     # Display filtered data info
     st.sidebar.markdown(f"**Filtered Data:** {len(data):,} transactions")
@@ -689,23 +901,39 @@ def main():
 
     # Main dashboard content
     if len(data) > 0:
+        # Revenue per division, weekday and category is shared by the charts
+        # and the executive summary, so each is aggregated once per rerun
+        division_revenue = data.groupby("division", sort=False, observed=True)[
+            "total_price"
+        ].sum()
+        weekday_revenue = data.groupby("weekday", sort=False, observed=True)[
+            "total_price"
+        ].sum()
+        category_revenue = data.groupby("main_category", sort=False, observed=True)[
+            "total_price"
+        ].sum()
+
+        # One pass over the customer key serves the KPI cards, the customer
+        # charts and the VIP threshold in the summary
+        customer_metrics = compute_customer_metrics(data)
+
         # KPI Metrics
-        create_kpi_metrics(data)
+        total_revenue = create_kpi_metrics(data, customer_metrics)
 
         # Revenue trends
         create_revenue_trends(data)
 
         # Geographic analysis
-        create_geographic_analysis(data)
+        create_geographic_analysis(data, division_revenue)
 
         # Customer analysis
-        create_customer_analysis(data)
+        create_customer_analysis(customer_metrics)
 
         # Product analysis
-        create_product_analysis(data)
+        create_product_analysis(data, category_revenue)
 
         # Time analysis
-        create_time_analysis(data)
+        create_time_analysis(data, weekday_revenue)
 
         # Payment analysis
         create_payment_analysis(data)
@@ -721,17 +949,15 @@ def main():
             st.info(
                 f"""
             **🎯 Key Insights:**
-            • Total Revenue: ${data['total_price'].sum():,.0f}
-            • Top Division: {data.groupby('division')['total_price'].sum().idxmax()}
-            • Peak Sales Day: {data.groupby('weekday')['total_price'].sum().idxmax()}
+            • Total Revenue: ${total_revenue:,.0f}
+            • Top Division: {division_revenue.idxmax()}
+            • Peak Sales Day: {weekday_revenue.idxmax()}
             """
             )
 
         with summary_col2:
-            top_category = data.groupby("main_category")["total_price"].sum().idxmax()
-            best_customer_segment = (
-                data.groupby("coustomer_key")["total_price"].sum().quantile(0.9)
-            )
+            top_category = category_revenue.idxmax()
+            best_customer_segment = customer_metrics["Total Spent"].quantile(0.9)
             st.success(
                 f"""
             **📈 Growth Opportunities:**
@@ -17,6 +17,10 @@ def install_requirements():
         "streamlit==1.28.0",
         "pandas==2.1.0",
         "numpy==1.24.3",
+        "polars==1.31.0",
+        "pyarrow==14.0.2",
+        "charset-normalizer==3.3.2",
+        "numba==0.57.1",
         "plotly==5.15.0",
         "seaborn==0.12.2",
         "matplotlib==3.7.2",
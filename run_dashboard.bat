@@ -3,7 +3,7 @@ echo Installing required packages for E-Commerce Dashboard...
 echo.
 
 REM Install required Python packages
-pip install streamlit pandas numpy plotly seaborn matplotlib
+pip install streamlit pandas numpy polars pyarrow charset-normalizer numba plotly seaborn matplotlib
 
 echo.
 echo Installation complete!